@@ -0,0 +1,34 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Writer-side ring drain for reciverserver.py as one C function call.
+
+Walks avail from `start`, copies the contiguous run of available samples out
+of ring_i32 and marks them consumed, returning how many were drained. The
+whole scan/copy/consume state machine runs with the GIL released, so the
+writer holds ring_lock for a single C call per iteration.
+
+Build in place (optional -- reciverserver.py falls back to NumPy without it):
+
+    python setup_ring_drain.py build_ext --inplace
+"""
+
+
+cdef Py_ssize_t _drain_impl(int[:] avail, int[:] ring_i32, int[:] out,
+                            long long start, Py_ssize_t cap,
+                            long long mask) noexcept nogil:
+    cdef Py_ssize_t i, pos
+    for i in range(cap):
+        pos = <Py_ssize_t>((start + i) & mask)
+        if avail[pos] == -1:
+            return i
+        out[i] = ring_i32[pos]
+        avail[pos] = -1
+    return cap
+
+
+def drain(int[:] avail, int[:] ring_i32, int[:] out,
+          long long start, Py_ssize_t cap, long long mask):
+    cdef Py_ssize_t n
+    with nogil:
+        n = _drain_impl(avail, ring_i32, out, start, cap, mask)
+    return n
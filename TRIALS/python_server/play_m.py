@@ -4,13 +4,12 @@ import soundfile as sf
 # Path to your audio file
 filename = "D:/microcontroller/auto-entM/python_server/freepik-pure-bliss.mp3"
 
-# Read the file
-data, samplerate = sf.read(filename, dtype='float32')
-
-# Play it
+# Stream the file in small blocks instead of decoding it all into RAM first:
+# memory stays at O(blocksize) and playback starts after one block instead of
+# after the whole file is decoded.
 print(f"Playing: {filename}")
-sd.play(data, samplerate)
-
-# Wait until playback finishes
-sd.wait()
+with sf.SoundFile(filename) as f:
+    with sd.OutputStream(samplerate=f.samplerate, channels=f.channels, dtype='float32') as out:
+        for block in f.blocks(blocksize=4096, dtype='float32'):
+            out.write(block)
 print("Done")
@@ -8,6 +8,7 @@ Plays received audio via sounddevice and writes to disk using soundfile.
 Author: assistant
 """
 
+import os
 import socket
 import threading
 import struct
@@ -28,7 +29,10 @@ SAMPLE_RATE = 48000        # must match the ESP setting
 CHANNELS = 1               # mono (ESP sends only mic channel)
 BYTES_PER_SAMPLE = 4       # 32-bit slots from ESP
 BUFFER_SECONDS = 8         # ring buffer size in seconds (store several seconds to cope with jitter)
-RING_BUFFER_SIZE = SAMPLE_RATE * BUFFER_SECONDS
+# round the ring up to a power of two so index wrapping is a bitwise AND
+# instead of an integer modulo (cheaper both in Python and across NumPy lanes)
+RING_BUFFER_SIZE = 1 << (SAMPLE_RATE * BUFFER_SECONDS - 1).bit_length()
+RING_MASK = RING_BUFFER_SIZE - 1
 
 # Jitter/playout: how far behind to play relative to the latest received sample (in seconds)
 # choose e.g., 0.1..0.5 depending on network stability. 0.2s is a good default.
@@ -40,6 +44,12 @@ HEADER_MAGIC = 0x45535032  # 'ESP2' low-endian encoded by ESP
 HEADER_SIZE = 34
 FORMAT_INT32_LEFT24 = 1
 
+# precompiled header layout (little-endian, packed as in the ESP sketch):
+# magic, seq, first_sample_index, timestamp_us, frames, channels,
+# bytes_per_sample, sample_rate, format_id
+HEADER_STRUCT = struct.Struct('<IIQQHBBIH')
+assert HEADER_STRUCT.size == HEADER_SIZE
+
 # Output file
 OUT_FILENAME = "received_high_quality.wav"
 OUT_SUBTYPE = "PCM_24"     # use 24-bit WAV (or "FLOAT" for float32)
@@ -47,10 +57,50 @@ OUT_SUBTYPE = "PCM_24"     # use 24-bit WAV (or "FLOAT" for float32)
 # Timeout for writer to wait for missing packets before zero-filling (seconds)
 WRITE_MISSING_TIMEOUT = 0.25
 
+# normalization factor for 24-bit samples: 1 / 2^23, kept as float32 so the
+# conversion below stays a single-precision pass with no float64 temporaries
+SAMPLE_SCALE = np.float32(1.0 / 8388608.0)
+
+# Optional Numba JIT for the per-packet sample conversion: one fused
+# shift+convert+scale loop that LLVM auto-vectorizes, instead of NumPy's
+# separate shift and cast passes. Falls back to the NumPy expression when
+# numba is not installed.
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _to_float(raw_i32, out_f32):
+        for i in prange(raw_i32.shape[0]):
+            out_f32[i] = (raw_i32[i] >> 8) * np.float32(1.1920929e-07)
+else:
+    def _to_float(raw_i32, out_f32):
+        np.multiply((raw_i32 >> 8).astype(np.float32), SAMPLE_SCALE, out=out_f32)
+
+# ---------------------- PREALLOCATED SCRATCH -----------------------
+# Reusable buffers so the hot paths never touch the allocator: the audio
+# callback runs on PortAudio's real-time thread where a page fault or
+# allocator stall is audible, and the writer loops ~6x/s at full rate.
+MAX_CALLBACK_FRAMES = 2048          # covers any blocksize we open the stream with
+WRITER_MAX_CHUNK = 8192
+
+_cb_mask = np.empty(MAX_CALLBACK_FRAMES, dtype=bool)
+_writer_chunk = np.empty(WRITER_MAX_CHUNK, dtype=np.int32)   # raw words for the file path
+_writer_mask = np.empty(WRITER_MAX_CHUNK, dtype=bool)
+_ZEROS = np.zeros(SAMPLE_RATE, dtype=np.int32)   # one second of silence for gap fills
+
 # ------------------------- GLOBAL STATE ------------------------
 # ring buffer for playback (float32 normalized [-1.0, 1.0])
 ring = np.zeros(RING_BUFFER_SIZE, dtype=np.float32)
 
+# shadow ring holding the raw left-aligned int32 words from the wire. The
+# disk path writes these directly: libsndfile's PCM_24 takes the top three
+# bytes of each int32, so the file gets the original 24-bit samples with no
+# int24 -> float32 -> int24 round trip (and no quantization on the way)
+ring_i32 = np.zeros(RING_BUFFER_SIZE, dtype=np.int32)
+
 # per-sample "availability" marker: stores packet seq that filled that sample, or -1 if empty
 avail = np.full(RING_BUFFER_SIZE, -1, dtype=np.int32)
 
@@ -70,6 +120,19 @@ shutdown_event = threading.Event()
 # queue for control/log messages
 log_q = queue.Queue()
 
+# ---------------------- HOT-PATH TELEMETRY ------------------------
+# The network loop and the audio callback must not call log(): Queue.put_nowait
+# takes a lock and allocates a formatted string per call, which is exactly
+# what a real-time path cannot afford. Instead the producer drops a fixed-size
+# record into this ring (plain numpy field stores, no locks) and log_printer
+# summarizes it at human rate. The callback only bumps an integer.
+EVT_RING_SIZE = 4096
+EVT_RING_MASK = EVT_RING_SIZE - 1
+_events = np.zeros(EVT_RING_SIZE, dtype=[('ts', 'f8'), ('seq', 'i8'),
+                                         ('idx', 'i8'), ('frames', 'i4')])
+_evt_head = 0        # total packet records written
+_xrun_count = 0      # callback status flags seen (under/overflow)
+
 # ------------------------- UTIL FUNCTIONS ----------------------
 
 def log(msg, *args):
@@ -80,113 +143,163 @@ def log(msg, *args):
     except queue.Full:
         pass
 
-def int64_from_bytes(b, offset):
-    # little-endian uint64
-    return int.from_bytes(b[offset:offset+8], 'little', signed=False)
+# CPU homes for the two hot threads. Keeping each on its own core (and both
+# away from 0/1, where IRQs and the rest of the system usually land) stops
+# the shared ring's cache lines from bouncing between cores. Linux only.
+NET_CPU = 2
+WRITER_CPU = 3
 
-def int32_from_bytes(b, offset):
-    return int.from_bytes(b[offset:offset+4], 'little', signed=False)
+def pin_current_thread(cpu):
+    """Pin the calling thread to one CPU; silently a no-op where unsupported
+    or on machines with too few cores."""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    if cpu >= (os.cpu_count() or 1):
+        return
+    try:
+        os.sched_setaffinity(0, {cpu})
+        log("Pinned %s to CPU %d", threading.current_thread().name, cpu)
+    except OSError:
+        pass
 
 # ---------------------- NETWORK / PARSE ------------------------
 
-def recvall(sock, n):
-    """Receive exactly n bytes from socket or raise IOError"""
-    data = bytearray()
-    while len(data) < n:
-        chunk = sock.recv(n - len(data))
-        if not chunk:
-            raise IOError("Socket closed")
-        data.extend(chunk)
-    return bytes(data)
+# largest payload a single packet can carry (frames field is uint16)
+MAX_PAYLOAD_BYTES = 65536 * BYTES_PER_SAMPLE
+
+# receive buffer for the buffered bulk parser: big enough for several packets
+# so one syscall typically drains everything the kernel has queued
+RECV_BUF_BYTES = 1 << 20
 
 def handle_client_connection(client_sock, client_addr):
     """Main loop for receiving packets from ESP and placing them into the ring buffer."""
-    global next_write_index, highest_received_index
+    global next_write_index, highest_received_index, published_head, _evt_head
+    pin_current_thread(NET_CPU)
     client_sock.settimeout(5.0)
+
+    # real-time tuning: disable Nagle (it would coalesce our ~1KB packets and
+    # add up to 40ms of jitter), and give the kernel room to absorb ~2s of
+    # audio so a brief stall on our side never drops data
+    client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 * 1024 * 1024)
+    if hasattr(socket, "SO_BUSY_POLL"):
+        # Linux: poll the NIC for up to 50us before sleeping -> sub-ms wakeups
+        try:
+            client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_BUSY_POLL, 50)
+        except OSError:
+            pass  # needs CAP_NET_ADMIN on some kernels; fine without it
+
     log("Client connected from %s:%d", client_addr[0], client_addr[1])
 
     # when first packet arrives, we'll initialize next_write_index to first_sample_index
     first_packet_seen = False
 
+    # Buffered bulk receive: instead of two blocking recvs per packet (header
+    # then payload), pull whatever the kernel has queued in one large
+    # recv_into and parse every complete packet out of it. This amortizes
+    # syscall and wakeup cost across many packets -- the same batching a
+    # multishot receive gives -- without extra dependencies.
+    recv_mv = memoryview(bytearray(RECV_BUF_BYTES))
+    filled = 0      # valid bytes currently in recv_mv
+    consumed = 0    # bytes already parsed out of recv_mv
+
     try:
         while not shutdown_event.is_set():
-            # read header
-            header = recvall(client_sock, HEADER_SIZE)
-            if len(header) != HEADER_SIZE:
-                raise IOError("Header truncated")
-
-            # parse header (little-endian as in ESP sketch)
-            magic = int.from_bytes(header[0:4], 'little', signed=False)
-            if magic != HEADER_MAGIC:
-                log("Invalid magic 0x%08X != expected 0x%08X - resyncing", magic, HEADER_MAGIC)
-                # try to re-sync: continue (could read again)
-                continue
-
-            seq = int.from_bytes(header[4:8], 'little', signed=False)
-            first_sample_index = int.from_bytes(header[8:16], 'little', signed=False)
-            timestamp_us = int.from_bytes(header[16:24], 'little', signed=False)
-            frames = int.from_bytes(header[24:26], 'little', signed=False)
-            channels = header[26]
-            bytes_per_sample = header[27]
-            sample_rate = int.from_bytes(header[28:32], 'little', signed=False)
-            format_id = int.from_bytes(header[32:34], 'little', signed=False)
-
-            # basic checks
-            if sample_rate != SAMPLE_RATE:
-                log("WARNING: sample_rate mismatch: packet %d has %d, expected %d", seq, sample_rate, SAMPLE_RATE)
-            if channels != CHANNELS:
-                log("WARNING: channels mismatch: packet %d has %d, expected %d", seq, channels, CHANNELS)
-            if bytes_per_sample != BYTES_PER_SAMPLE:
-                log("WARNING: bytes_per_sample mismatch: %d != %d", bytes_per_sample, BYTES_PER_SAMPLE)
-
-            # compute payload size
-            payload_bytes = frames * channels * bytes_per_sample
-
-            # receive payload
-            payload = recvall(client_sock, payload_bytes)
-
-            # Convert payload (32-bit little endian words containing left-aligned 24-bit samples)
-            # payload is consecutive int32 for each sample (mono). We'll interpret as little-endian int32 array.
-            int32_arr = np.frombuffer(payload, dtype='<i4')  # little-endian int32
-            # Convert left-aligned 24-bit to signed 24-bit -> right-shift 8 bits (arithmetic)
-            # Numpy right-shift on signed int behaves as arithmetic shift in practice
-            shifted = (int32_arr >> 8).astype(np.int32)
-            # normalize to float32 in range ~[-1, 1]
-            float_arr = shifted.astype(np.float32) / 8388608.0  # 2^23
-
-            # if this is the first packet we see, initialize next_write_index and playback base
-            if not first_packet_seen:
-                with write_lock:
-                    next_write_index = first_sample_index
-                # start playback index a little behind the first sample to allow buffer fill
-                # the playback callback computes its own start based on next_write_index
-                first_packet_seen = True
-                log("First packet: seq=%d first_sample_index=%d frames=%d ts_us=%d", seq, first_sample_index, frames, timestamp_us)
+            # compact any partial packet to the front, then top up with one recv
+            if consumed:
+                if filled > consumed:
+                    recv_mv[:filled - consumed] = recv_mv[consumed:filled]
+                filled -= consumed
+                consumed = 0
+            got = client_sock.recv_into(recv_mv[filled:], RECV_BUF_BYTES - filled)
+            if got == 0:
+                raise IOError("Socket closed")
+            filled += got
+
+            # parse every complete packet currently buffered
+            while filled - consumed >= HEADER_SIZE:
+                # parse header (little-endian as in ESP sketch) in one C-level unpack
+                (magic, seq, first_sample_index, timestamp_us, frames,
+                 channels, bytes_per_sample, sample_rate, format_id) = HEADER_STRUCT.unpack_from(recv_mv, consumed)
+                if magic != HEADER_MAGIC:
+                    log("Invalid magic 0x%08X != expected 0x%08X - resyncing", magic, HEADER_MAGIC)
+                    # skip this header-sized window and try again
+                    consumed += HEADER_SIZE
+                    continue
+
+                # basic checks
+                if sample_rate != SAMPLE_RATE:
+                    log("WARNING: sample_rate mismatch: packet %d has %d, expected %d", seq, sample_rate, SAMPLE_RATE)
+                if channels != CHANNELS:
+                    log("WARNING: channels mismatch: packet %d has %d, expected %d", seq, channels, CHANNELS)
+                if bytes_per_sample != BYTES_PER_SAMPLE:
+                    log("WARNING: bytes_per_sample mismatch: %d != %d", bytes_per_sample, BYTES_PER_SAMPLE)
+
+                # compute payload size; anything beyond the wire maximum means
+                # the header is corrupt, and waiting for that many bytes would
+                # wedge the parser -- resync instead
+                payload_bytes = frames * channels * bytes_per_sample
+                if payload_bytes > MAX_PAYLOAD_BYTES:
+                    log("Implausible payload size %d (seq=%d) - resyncing", payload_bytes, seq)
+                    consumed += HEADER_SIZE
+                    continue
+
+                # wait for more data if the payload is not all here yet
+                if filled - consumed < HEADER_SIZE + payload_bytes:
+                    break
 
-            # Put samples into ring buffer in correct absolute positions
-            with ring_lock:
-                # update highest_received_index for monitoring
-                end_index = first_sample_index + frames - 1
-                if end_index > highest_received_index:
-                    highest_received_index = end_index
-
-                # write into ring with modulo wrapping
-                pos = int(first_sample_index % RING_BUFFER_SIZE)
-                if pos + frames <= RING_BUFFER_SIZE:
-                    ring[pos:pos+frames] = float_arr
-                    avail[pos:pos+frames] = seq
-                else:
-                    # split across wrap
-                    first_len = RING_BUFFER_SIZE - pos
-                    ring[pos:pos+first_len] = float_arr[:first_len]
+                # View the payload in place in the receive buffer (32-bit little
+                # endian words containing left-aligned 24-bit samples) -- no
+                # bytes object per packet. Conversion happens directly into the
+                # ring below, so no staging float array exists either.
+                int32_arr = np.frombuffer(recv_mv, dtype='<i4', count=frames * channels, offset=consumed + HEADER_SIZE)
+                consumed += HEADER_SIZE + payload_bytes
+
+                # if this is the first packet we see, initialize next_write_index and playback base
+                if not first_packet_seen:
+                    with write_lock:
+                        next_write_index = first_sample_index
+                    # start playback index a little behind the first sample to allow buffer fill
+                    # the playback callback computes its own start based on next_write_index
+                    first_packet_seen = True
+                    log("First packet: seq=%d first_sample_index=%d frames=%d ts_us=%d", seq, first_sample_index, frames, timestamp_us)
+
+                # Put samples into ring buffer in correct absolute positions
+                with ring_lock:
+                    # update highest_received_index for monitoring
+                    end_index = first_sample_index + frames - 1
+                    if end_index > highest_received_index:
+                        highest_received_index = end_index
+
+                    # commit straight from the wire view into the rings as (up
+                    # to) two contiguous pieces: raw words memcpy into ring_i32
+                    # and _to_float converts directly into the float ring slice,
+                    # so the payload is touched exactly once per destination
+                    # with no intermediate float array
+                    pos = int(first_sample_index & RING_MASK)
+                    first_len = min(frames, RING_BUFFER_SIZE - pos)
+                    np.copyto(ring_i32[pos:pos+first_len], int32_arr[:first_len])
+                    _to_float(int32_arr[:first_len], ring[pos:pos+first_len])
                     avail[pos:pos+first_len] = seq
                     rest = frames - first_len
-                    ring[0:rest] = float_arr[first_len:]
-                    avail[0:rest] = seq
-
-            # Wake writer thread if new data is available
-            # We'll use a simple notify via writing to log queue (writer polls)
-            log("pkt seq=%d idx=%d frames=%d ts_us=%d", seq, first_sample_index, frames, timestamp_us)
+                    if rest:
+                        np.copyto(ring_i32[:rest], int32_arr[first_len:])
+                        _to_float(int32_arr[first_len:], ring[:rest])
+                        avail[:rest] = seq
+
+                    # publish after the slice writes: the callback reads this
+                    # without the lock and never looks past it
+                    if first_sample_index + frames > published_head:
+                        published_head = first_sample_index + frames
+
+                # record the packet in the telemetry ring (no locks, no strings);
+                # log_printer summarizes these at 1 Hz
+                slot = _evt_head & EVT_RING_MASK
+                _events[slot]['ts'] = timestamp_us
+                _events[slot]['seq'] = seq
+                _events[slot]['idx'] = first_sample_index
+                _events[slot]['frames'] = frames
+                _evt_head += 1
 
     except Exception as e:
         log("Client connection ended or error: %s", str(e))
@@ -205,38 +318,55 @@ playback_start_index = None  # absolute sample index being played at start
 playback_index_lock = threading.Lock()
 playback_index = 0           # next sample index the callback should output
 
+# Highest absolute sample index + 1 that the producer has fully written into
+# the ring (SPSC publish pointer). The producer stores it after the slice
+# writes; the GIL makes the int store/load atomic, so the callback can read it
+# without taking ring_lock. The callback only ever touches samples < this.
+published_head = 0
+
 def audio_callback(outdata, frames, time_info, status):
     """sounddevice callback. Must be very fast and non-blocking."""
-    global playback_index, playback_start_index
+    global playback_index, playback_start_index, _xrun_count
     # outdata is Nx1 float32 buffer
     if status:
-        log("sounddevice status: %s", status)
+        # no logging here: counting is the only thing cheap enough for the
+        # real-time thread; main reports it in the 1 Hz STAT line
+        _xrun_count += 1
 
-    # Try to get lock quickly; if not available, output silence to avoid blocking
-    got = ring_lock.acquire(False)
-    if not got:
+    # If playback_start_index not initialized, we can't play; fill silence
+    if playback_start_index is None:
         outdata.fill(0.0)
         return
-    try:
-        # If playback_start_index not initialized, we can't play; fill silence
-        if playback_start_index is None:
-            outdata.fill(0.0)
-            return
-
-        # read samples from ring according to playback_index
-        buf = np.empty((frames,), dtype=np.float32)
-        for i in range(frames):
-            idx = playback_index + i
-            pos = int(idx % RING_BUFFER_SIZE)
-            # if available marker is -1 (no data) then output 0
-            if avail[pos] == -1:
-                buf[i] = 0.0
-            else:
-                buf[i] = ring[pos]
-        playback_index += frames
-        outdata[:] = buf.reshape(outdata.shape)  # assign
-    finally:
-        ring_lock.release()
+
+    # Lock-free consume: only read samples the producer has published, and
+    # zero-fill whatever is not there yet. No lock on the real-time path, so
+    # the callback can never be stalled (or starved into silence) by the
+    # network or writer threads.
+    head = published_head
+    n = min(frames, max(0, head - playback_index))
+    out = outdata[:, 0]
+    if n < frames:
+        out[n:] = 0.0
+    if n > 0:
+        pos = int(playback_index & RING_MASK)
+        end = pos + n
+        if end <= RING_BUFFER_SIZE:
+            # common case: no wrap -> single contiguous gather
+            np.copyto(out[:n], ring[pos:end])
+            mask = _cb_mask[:n]
+            np.equal(avail[pos:end], -1, out=mask)
+            out[:n][mask] = 0.0
+        else:
+            # wrap: two contiguous slices
+            first_len = RING_BUFFER_SIZE - pos
+            rest = n - first_len
+            np.copyto(out[:first_len], ring[pos:])
+            np.copyto(out[first_len:n], ring[:rest])
+            mask = _cb_mask[:n]
+            np.equal(avail[pos:], -1, out=mask[:first_len])
+            np.equal(avail[:rest], -1, out=mask[first_len:])
+            out[:n][mask] = 0.0
+    playback_index += frames
 
 def start_playback_stream():
     """Start the sounddevice OutputStream with the callback."""
@@ -264,19 +394,58 @@ def start_playback_stream():
     log("Starting playback: playback_start_index=%d (latency frames=%d)", playback_start_index, PLAYOUT_LATENCY_FRAMES)
 
     # open sounddevice output stream, mono
-    stream = sd.OutputStream(samplerate=SAMPLE_RATE, channels=1, dtype='float32', callback=audio_callback, blocksize=1024)
+    stream = sd.OutputStream(samplerate=SAMPLE_RATE, channels=1, dtype='float32', callback=audio_callback, blocksize=1024, latency='low')
     stream.start()
     log("sounddevice output stream started")
     return stream
 
 # ------------------------- WRITER THREAD --------------------------
 
+def _drain_py(avail_arr, ring_arr, out, start, cap, mask):
+    """Drain the contiguous run of available samples starting at absolute
+    index `start` into `out`, marking them consumed; returns the count.
+    Vectorized fallback for the Cython version in _ring_drain.pyx."""
+    size = mask + 1
+    pos = int(start) & mask
+    m = _writer_mask[:cap]
+    n = 0
+    if pos + cap <= size:
+        np.equal(avail_arr[pos:pos+cap], -1, out=m)
+        n = int(m.argmax()) if m.any() else cap
+        if n > 0:
+            np.copyto(out[:n], ring_arr[pos:pos+n])
+            avail_arr[pos:pos+n] = -1
+    else:
+        first_len = size - pos
+        rest = cap - first_len
+        np.equal(avail_arr[pos:], -1, out=m[:first_len])
+        np.equal(avail_arr[:rest], -1, out=m[first_len:])
+        n = int(m.argmax()) if m.any() else cap
+        if n > 0:
+            if n <= first_len:
+                np.copyto(out[:n], ring_arr[pos:pos+n])
+                avail_arr[pos:pos+n] = -1
+            else:
+                np.copyto(out[:first_len], ring_arr[pos:])
+                np.copyto(out[first_len:n], ring_arr[:n-first_len])
+                avail_arr[pos:] = -1
+                avail_arr[:n-first_len] = -1
+    return n
+
+# prefer the compiled drain (single nogil C call per writer iteration);
+# build it with setup_ring_drain.py, otherwise the NumPy fallback is used
+try:
+    from _ring_drain import drain as _drain
+except ImportError:
+    _drain = _drain_py
+
 def writer_thread_fn():
     """Continuously write contiguous audio to disk based on next_write_index.
        We read from the ring buffer and write to the soundfile. If data is missing
        for longer than WRITE_MISSING_TIMEOUT, we write zeros to preserve timeline.
     """
     global next_write_index
+    pin_current_thread(WRITER_CPU)
     # open soundfile for writing
     sf_file = sf.SoundFile(OUT_FILENAME, mode='w', samplerate=SAMPLE_RATE, channels=1, subtype=OUT_SUBTYPE)
     log("Opened output file %s (samplerate=%d, subtype=%s)", OUT_FILENAME, SAMPLE_RATE, OUT_SUBTYPE)
@@ -293,46 +462,45 @@ def writer_thread_fn():
 
     last_progress_time = time.time()
     while not shutdown_event.is_set():
-        # attempt to write any contiguous region starting at next_write_index
-        contiguous_frames = 0
-        # collect frames into a list or array for a max chunk
-        max_chunk = 8192
-        chunk_list = []
-
+        # drain the contiguous region starting at next_write_index: scan,
+        # copy-out and mark-consumed happen in one _drain call under the lock
         with ring_lock:
-            # check availability of samples starting at next_write_index
-            for i in range(max_chunk):
-                idx = next_write_index + i
-                pos = int(idx % RING_BUFFER_SIZE)
-                if avail[pos] != -1:
-                    chunk_list.append(ring[pos])
-                else:
-                    break
-            contiguous_frames = len(chunk_list)
+            contiguous_frames = _drain(avail, ring_i32, _writer_chunk,
+                                       next_write_index, WRITER_MAX_CHUNK, RING_MASK)
 
         if contiguous_frames > 0:
-            # write contiguous_frames to disk
-            arr = np.array(chunk_list, dtype=np.float32)
-            sf_file.write(arr)
+            # write to disk outside ring_lock so the callback never waits on I/O
+            sf_file.write(_writer_chunk[:contiguous_frames])
             with write_lock:
                 next_write_index += contiguous_frames
-            # mark avail entries as consumed (optional) to reduce memory retention
-            with ring_lock:
-                for i in range(contiguous_frames):
-                    pos = int((next_write_index - contiguous_frames + i) % RING_BUFFER_SIZE)
-                    avail[pos] = -1
             last_progress_time = time.time()
             continue
 
         # no contiguous data available at the moment
-        # if nothing new for WRITE_MISSING_TIMEOUT, zero-fill one packet-worth to keep timeline moving
-        if time.time() - last_progress_time > WRITE_MISSING_TIMEOUT:
-            zeros = np.zeros(1024, dtype=np.float32)
-            sf_file.write(zeros)
-            with write_lock:
-                next_write_index += 1024
-            log("Writer: missing data for %.3fs -> zero-filled 1024 frames at idx=%d", WRITE_MISSING_TIMEOUT, next_write_index - 1024)
-            last_progress_time = time.time()
+        # if nothing new for WRITE_MISSING_TIMEOUT, zero-fill the whole gap in
+        # one write: look ahead in avail for the next sample that did arrive
+        # and pad exactly up to it (capped at one second when nothing is in
+        # sight), from the preallocated silence buffer
+        now = time.time()
+        if now - last_progress_time > WRITE_MISSING_TIMEOUT:
+            with ring_lock:
+                pos = int(next_write_index & RING_MASK)
+                cap = min(SAMPLE_RATE, RING_BUFFER_SIZE - pos)
+                ahead = avail[pos:pos+cap] != -1
+                if ahead.any():
+                    # pad exactly up to the next sample that did arrive
+                    gap = int(ahead.argmax())
+                else:
+                    # nothing in sight: pad no faster than real time. On TCP
+                    # stalled data is late, not lost -- if we outran the
+                    # stream here, the audio would be discarded when it lands
+                    gap = min(cap, int((now - last_progress_time) * SAMPLE_RATE))
+            if gap > 0:
+                sf_file.write(_ZEROS[:gap])
+                with write_lock:
+                    next_write_index += gap
+                log("Writer: missing data for %.3fs -> zero-filled %d frames at idx=%d", now - last_progress_time, gap, next_write_index - gap)
+            last_progress_time = now
             continue
 
         # otherwise wait briefly
@@ -367,12 +535,25 @@ def tcp_server_thread():
 # ------------------------- LOG PRINTER ----------------------------
 
 def log_printer():
+    evt_seen = 0
+    last_summary = time.time()
     while not shutdown_event.is_set():
         try:
             line = log_q.get(timeout=0.5)
             print(line)
         except queue.Empty:
-            continue
+            pass
+        # summarize hot-path packet records at 1 Hz instead of one line each
+        now = time.time()
+        if now - last_summary >= 1.0:
+            head = _evt_head
+            if head > evt_seen:
+                last = _events[(head - 1) & EVT_RING_MASK]
+                print("[%s] pkt x%d, last seq=%d idx=%d frames=%d" % (
+                    time.strftime("%H:%M:%S"), head - evt_seen,
+                    last['seq'], last['idx'], last['frames']))
+                evt_seen = head
+            last_summary = now
 
 # --------------------------- MAIN --------------------------------
 
@@ -412,7 +593,7 @@ def main():
                 nw = next_write_index
             with playback_index_lock:
                 pb = playback_index
-            log("STAT highest_received=%d next_write=%s playback_index=%s", hr, str(nw), str(pb))
+            log("STAT highest_received=%d next_write=%s playback_index=%s xruns=%d", hr, str(nw), str(pb), _xrun_count)
     except KeyboardInterrupt:
         shutdown_event.set()
 
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""Build the optional Cython drain helper for reciverserver.py:
+
+    python setup_ring_drain.py build_ext --inplace
+"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(ext_modules=cythonize("_ring_drain.pyx"))
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+udp_reciverserver.py
+
+UDP receiver for the ESP32 streamer (same 34-byte header as the TCP variant).
+UDP avoids TCP's head-of-line blocking on retransmit, which is what we want
+for live playback: a lost packet becomes a short zero-fill instead of a
+latency spike. Out-of-order arrival is handled by a small reorder buffer
+keyed on the packet's absolute first_sample_index.
+
+Plays received audio via sounddevice and writes a 16-bit WAV to disk.
+"""
+
+import socket
+import threading
+import struct
+import time
+import wave
+import ctypes
+import errno
+import select
+import numpy as np
+import sounddevice as sd
+import queue
+import signal
+
+# --------------------------- CONFIG ---------------------------
+LISTEN_HOST = "0.0.0.0"
+LISTEN_PORT = 7001         # must match PC_PORT on ESP (UDP build)
+
+SAMPLE_RATE = 48000        # must match the ESP setting
+CHANNELS = 1               # mono (ESP sends only mic channel)
+BYTES_PER_SAMPLE = 4       # 32-bit slots from ESP
+
+# Header constants (must match ESP header)
+HEADER_MAGIC = 0x45535032  # 'ESP2' low-endian encoded by ESP
+HEADER_SIZE = 34
+
+# precompiled header layout, identical to the TCP receiver:
+# magic, seq, first_sample_index, timestamp_us, frames, channels,
+# bytes_per_sample, sample_rate, format_id
+HEADER_STRUCT = struct.Struct('<IIQQHBBIH')
+assert HEADER_STRUCT.size == HEADER_SIZE
+
+# largest datagram we expect (header + payload)
+MAX_DATAGRAM = 65536
+
+# Reorder buffer: how many out-of-order packets to hold before deciding the
+# missing one is lost, and how long to wait for it
+REORDER_DEPTH = 16
+REORDER_TIMEOUT = 0.25     # seconds
+
+# never zero-fill more than this many frames for a single gap
+MAX_GAP_FRAMES = SAMPLE_RATE
+
+# Output file
+OUT_FILENAME = "received_udp.wav"
+
+# ------------------------- GLOBAL STATE ------------------------
+# Raw datagrams flow listener -> player/writer through a lock-free SPSC ring
+# of preallocated slots. queue.Queue takes a mutex + condvar on every
+# put/get; with one producer and one consumer the GIL's atomic int
+# loads/stores are ordering enough: the producer copies into the slot first
+# and bumps _pkt_head after, the consumer bumps _pkt_tail only once it is
+# done with the slot.
+PKT_RING_SIZE = 1024       # power of two
+PKT_RING_MASK = PKT_RING_SIZE - 1
+PKT_SLOT_BYTES = 2048      # per-datagram slot; ESP packets are MTU-sized
+
+_pkt_bufs = [bytearray(PKT_SLOT_BYTES) for _ in range(PKT_RING_SIZE)]
+_pkt_lens = [0] * PKT_RING_SIZE
+_pkt_head = 0              # total packets produced (next slot: head & MASK)
+_pkt_tail = 0              # total packets consumed (next slot: tail & MASK)
+_pkt_drops = 0             # datagrams dropped because the ring was full
+
+shutdown_event = threading.Event()
+
+log_q = queue.Queue()
+
+# ------------------------- UTIL FUNCTIONS ----------------------
+
+def log(msg, *args):
+    ts = time.strftime("%H:%M:%S")
+    line = f"[{ts}] " + (msg % args if args else msg)
+    try:
+        log_q.put_nowait(line)
+    except queue.Full:
+        pass
+
+# ------------------------- UDP LISTENER ------------------------
+
+def _enqueue_packet(data):
+    """Producer side of the SPSC packet ring (udp_listener thread only)."""
+    global _pkt_head, _pkt_drops
+    head = _pkt_head
+    if head - _pkt_tail >= PKT_RING_SIZE:
+        # ring full: the consumer is stalled; ~1024 packets of backlog is
+        # already seconds of audio, so dropping the new datagram is fine
+        _pkt_drops += 1
+        return
+    slot = head & PKT_RING_MASK
+    n = min(len(data), PKT_SLOT_BYTES)
+    _pkt_bufs[slot][:n] = data[:n]
+    _pkt_lens[slot] = n
+    # publish only after the copy so the consumer never sees a partial slot
+    _pkt_head = head + 1
+
+# ctypes plumbing for recvmmsg(2): receive up to RECV_BATCH datagrams per
+# syscall instead of one recvfrom round-trip each. Linux only; everywhere
+# else the plain recvfrom loop below is used.
+RECV_BATCH = 64
+RECV_SLOT = PKT_SLOT_BYTES
+
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint),
+                ("msg_iov", ctypes.POINTER(_iovec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr),
+                ("msg_len", ctypes.c_uint)]
+
+try:
+    # CDLL(None) raises TypeError on Windows rather than OSError; catch it
+    # too so import falls through to the recvfrom path there
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _libc.recvmmsg
+except (OSError, AttributeError, TypeError):
+    _libc = None
+
+def _listen_recvmmsg(sock):
+    """Drain the socket with recvmmsg: one syscall per batch of datagrams."""
+    sock.setblocking(False)
+    fd = sock.fileno()
+
+    # one contiguous backing buffer, RECV_BATCH fixed slots into it
+    bufs = bytearray(RECV_BATCH * RECV_SLOT)
+    cbuf = (ctypes.c_char * len(bufs)).from_buffer(bufs)
+    base = ctypes.addressof(cbuf)
+    mv = memoryview(bufs)
+    iovecs = (_iovec * RECV_BATCH)()
+    hdrs = (_mmsghdr * RECV_BATCH)()
+    for i in range(RECV_BATCH):
+        iovecs[i].iov_base = base + i * RECV_SLOT
+        iovecs[i].iov_len = RECV_SLOT
+        hdrs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        hdrs[i].msg_hdr.msg_iovlen = 1
+
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+
+    while not shutdown_event.is_set():
+        if not poller.poll(500):
+            continue
+        n = _libc.recvmmsg(fd, hdrs, RECV_BATCH, 0, None)
+        if n <= 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                continue
+            log("recvmmsg error: %s", errno.errorcode.get(err, str(err)))
+            time.sleep(0.1)
+            continue
+        for i in range(n):
+            off = i * RECV_SLOT
+            # memoryview slice: copied straight into the ring slot, no
+            # intermediate bytes object
+            _enqueue_packet(mv[off:off + hdrs[i].msg_len])
+
+def _listen_recvfrom(sock):
+    """Portable fallback: one recvfrom per datagram."""
+    sock.settimeout(0.5)
+    while not shutdown_event.is_set():
+        try:
+            data, addr = sock.recvfrom(RECV_SLOT)
+        except socket.timeout:
+            continue
+        except OSError as e:
+            log("recvfrom error: %s", str(e))
+            continue
+        _enqueue_packet(data)
+
+def udp_listener():
+    """Receive datagrams and hand them to the player/writer thread.
+
+    Kept deliberately minimal: receive + enqueue, nothing else, so the
+    socket is drained as fast as Python allows and the kernel buffer
+    (8 MB, ~20 s of audio) absorbs any processing hiccups.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sock.bind((LISTEN_HOST, LISTEN_PORT))
+    log("UDP listener on %s:%d (recvmmsg=%s)", LISTEN_HOST, LISTEN_PORT,
+        "yes" if _libc is not None else "no")
+
+    if _libc is not None:
+        _listen_recvmmsg(sock)
+    else:
+        _listen_recvfrom(sock)
+
+    sock.close()
+    log("UDP listener exiting")
+
+# ---------------------- PLAYER / WRITER ------------------------
+
+def player_and_writer():
+    """Parse datagrams, reorder them by absolute sample index, and feed the
+    in-order int16 stream to both the audio output and the WAV file.
+
+    Packets can arrive out of order; we hold them in `pending` keyed on
+    first_sample_index and emit whatever is contiguous. A gap is declared
+    lost after REORDER_TIMEOUT (or when REORDER_DEPTH packets queue up
+    behind it) and zero-filled to keep the timeline intact.
+    """
+    stream = sd.RawOutputStream(samplerate=SAMPLE_RATE, channels=CHANNELS,
+                                dtype='int16', latency='low')
+    stream.start()
+
+    wf = wave.open(OUT_FILENAME, 'wb')
+    wf.setnchannels(CHANNELS)
+    wf.setsampwidth(2)
+    wf.setframerate(SAMPLE_RATE)
+    log("Opened output file %s (16-bit, %d Hz)", OUT_FILENAME, SAMPLE_RATE)
+
+    pending = {}          # first_sample_index -> (frames, int16 bytes)
+    expected = None       # next absolute sample index to emit
+    last_emit = time.time()
+
+    # fixed conversion scratch, reused for every packet: the int32 shift
+    # lands in shift_buf and the int16 result in pcm_buf, so the in-order
+    # fast path below allocates nothing per packet
+    max_samples = PKT_SLOT_BYTES // BYTES_PER_SAMPLE
+    shift_buf = np.empty(max_samples, dtype='<i4')
+    pcm_buf = np.empty(max_samples, dtype='<i2')
+
+    global _pkt_tail
+
+    while not shutdown_event.is_set():
+        # consumer side of the SPSC ring: a view into the slot, valid until
+        # we bump _pkt_tail below (the conversion copies the samples out)
+        if _pkt_tail < _pkt_head:
+            slot = _pkt_tail & PKT_RING_MASK
+            data = memoryview(_pkt_bufs[slot])[:_pkt_lens[slot]]
+        else:
+            data = None
+            time.sleep(0.0005)
+
+        if data is not None and len(data) >= HEADER_SIZE:
+            (magic, seq, first_sample_index, timestamp_us, frames,
+             channels, bytes_per_sample, sample_rate, format_id) = HEADER_STRUCT.unpack_from(data)
+            payload_bytes = frames * channels * bytes_per_sample
+            if magic != HEADER_MAGIC or len(data) < HEADER_SIZE + payload_bytes:
+                log("Bad datagram (magic=0x%08X len=%d) - dropped", magic, len(data))
+            else:
+                # left-aligned 24-bit in int32 -> int16 for playback/archive,
+                # converted through the reusable scratch buffers
+                nsamp = frames * channels
+                int32_arr = np.frombuffer(data, dtype='<i4', count=nsamp,
+                                          offset=HEADER_SIZE)
+                np.right_shift(int32_arr, 16, out=shift_buf[:nsamp])
+                pcm16 = pcm_buf[:nsamp]
+                pcm16[:] = shift_buf[:nsamp]
+
+                if expected is None:
+                    expected = first_sample_index
+                if first_sample_index == expected:
+                    # in-order fast path: play/archive straight from the
+                    # scratch view, nothing allocated or copied
+                    stream.write(pcm16)
+                    wf.writeframes(pcm16)
+                    expected += frames
+                    last_emit = time.time()
+                elif first_sample_index > expected:
+                    # out-of-order: must own a copy, the scratch is reused
+                    pending[first_sample_index] = (frames, pcm16.tobytes())
+
+        if data is not None:
+            # done with the slot; the producer may now reuse it
+            _pkt_tail += 1
+
+        # emit everything contiguous from `expected`
+        while expected is not None and expected in pending:
+            frames_n, pcm16 = pending.pop(expected)
+            stream.write(pcm16)
+            wf.writeframes(pcm16)
+            expected += frames_n
+            last_emit = time.time()
+
+        # a hole at `expected`: declare it lost after a bounded wait and
+        # zero-fill up to the oldest packet we do have
+        if pending and (len(pending) > REORDER_DEPTH or
+                        time.time() - last_emit > REORDER_TIMEOUT):
+            nxt = min(pending)
+            gap = min(nxt - expected, MAX_GAP_FRAMES)
+            if gap > 0:
+                zeros = b"\x00" * (gap * 2 * CHANNELS)
+                stream.write(zeros)
+                wf.writeframes(zeros)
+                log("Gap of %d frames at idx=%d -> zero-filled", gap, expected)
+            expected = max(nxt, expected + gap)
+            last_emit = time.time()
+
+    stream.stop()
+    stream.close()
+    wf.close()
+    log("Player/writer exiting, file closed.")
+
+# ------------------------- LOG PRINTER ----------------------------
+
+def log_printer():
+    while not shutdown_event.is_set():
+        try:
+            line = log_q.get(timeout=0.5)
+            print(line)
+        except queue.Empty:
+            continue
+
+# --------------------------- MAIN --------------------------------
+
+def main():
+    def on_sigint(sig, frame):
+        log("SIGINT received, shutting down...")
+        shutdown_event.set()
+    signal.signal(signal.SIGINT, on_sigint)
+    signal.signal(signal.SIGTERM, on_sigint)
+
+    t_listen = threading.Thread(target=udp_listener, daemon=True)
+    t_listen.start()
+
+    t_player = threading.Thread(target=player_and_writer, daemon=True)
+    t_player.start()
+
+    t_log = threading.Thread(target=log_printer, daemon=True)
+    t_log.start()
+
+    try:
+        while not shutdown_event.is_set():
+            time.sleep(1.0)
+            log("STAT queued=%d dropped=%d", _pkt_head - _pkt_tail, _pkt_drops)
+    except KeyboardInterrupt:
+        shutdown_event.set()
+
+    time.sleep(0.5)
+
+if __name__ == "__main__":
+    main()